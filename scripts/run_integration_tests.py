@@ -1,20 +1,69 @@
 #!/usr/bin/env python3
 """
 Integration tests: run the MCP server as a subprocess and exercise the protocol.
-Requires: project root with uv and server.py (run from repo root).
+Runs server.py with the project's .venv interpreter (create it once with `uv sync`),
+falling back to the current interpreter.
 Optional: Ollama running at OLLAMA_BASE_URL for real tool results; otherwise
 list_models returns an error message string (still a valid tool result).
 """
+import asyncio
 import json
 import os
-import subprocess
 import sys
-import threading
 from pathlib import Path
 
 # Project root (parent of scripts/)
 ROOT = Path(__file__).resolve().parent.parent
 SERVER_PY = ROOT / "server.py"
+VENV_PY = ROOT / ".venv" / ("Scripts/python.exe" if os.name == "nt" else "bin/python")
+
+_EXPECTED_TOOLS = frozenset(
+    {
+        "ollama_version",
+        "list_models",
+        "list_running_models",
+        "show_model",
+        "chat",
+        "generate",
+        "embed",
+        "copy_model",
+        "pull_model",
+        "delete_model",
+        "batch",
+    }
+)
+
+
+def _encode(message: dict) -> bytes:
+    return (json.dumps(message) + "\n").encode("utf-8")
+
+
+# Fixed protocol messages, encoded once
+_INIT_REQ_BYTES = _encode(
+    {
+        "jsonrpc": "2.0",
+        "id": 1,
+        "method": "initialize",
+        "params": {
+            "protocolVersion": "2024-11-05",
+            "capabilities": {},
+            "clientInfo": {"name": "integration-test", "version": "0.1.0"},
+        },
+    }
+)
+_INITIALIZED_BYTES = _encode({"jsonrpc": "2.0", "method": "notifications/initialized"})
+_LIST_REQ_BYTES = _encode({"jsonrpc": "2.0", "id": 2, "method": "tools/list"})
+_CALL_LIST_MODELS_BYTES = _encode(
+    {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": {"name": "list_models", "arguments": {}}}
+)
+_CALL_GENERATE_BYTES = _encode(
+    {
+        "jsonrpc": "2.0",
+        "id": 4,
+        "method": "tools/call",
+        "params": {"name": "generate", "arguments": {"model": "llama3.2", "prompt": "Say 1", "stream": False}},
+    }
+)
 
 
 def _timeout_default() -> float:
@@ -33,31 +82,26 @@ def _generate_timeout() -> float:
         return 60.0
 
 
-def read_line_with_timeout(pipe, timeout: float) -> str | None:
-    """Read a single line from pipe; return None on timeout."""
-    result: list[str | None] = [None]
-
-    def read():
-        line = pipe.readline()
-        result[0] = line.decode("utf-8", errors="replace") if isinstance(line, bytes) else line
-
-    t = threading.Thread(target=read, daemon=True)
-    t.start()
-    t.join(timeout=timeout)
-    return result[0] if t.is_alive() is False else None
+async def read_line_with_timeout(reader: asyncio.StreamReader, timeout: float) -> str | None:
+    """Read a single line from reader; return None on timeout or EOF."""
+    try:
+        line = await asyncio.wait_for(reader.readline(), timeout)
+    except asyncio.TimeoutError:
+        return None
+    return line.decode("utf-8", errors="replace") if line else None
 
 
-def send_request(proc: subprocess.Popen, request: dict, timeout: float | None = None) -> dict | None:
-    """Send one JSON-RPC request and read one response line."""
+async def send_request_raw(
+    proc: asyncio.subprocess.Process, payload: bytes, timeout: float | None = None
+) -> dict | None:
+    """Send one pre-encoded JSON-RPC request line and read one response line."""
     if timeout is None:
         timeout = _timeout_default()
-    out = proc.stdin
-    if out is None:
+    if proc.stdin is None or proc.stdout is None:
         return None
-    line = (json.dumps(request) + "\n").encode("utf-8")
-    out.write(line)
-    out.flush()
-    raw = read_line_with_timeout(proc.stdout, timeout) if proc.stdout else None
+    proc.stdin.write(payload)
+    await proc.stdin.drain()
+    raw = await read_line_with_timeout(proc.stdout, timeout)
     if raw is None:
         return None
     raw = raw.strip()
@@ -69,7 +113,7 @@ def send_request(proc: subprocess.Popen, request: dict, timeout: float | None =
         return {"error": {"message": f"Invalid JSON: {raw[:200]}"}}
 
 
-def main() -> int:
+async def _run() -> int:
     if not SERVER_PY.exists():
         print(f"Not found: {SERVER_PY}", file=sys.stderr)
         return 1
@@ -77,37 +121,25 @@ def main() -> int:
     env = os.environ.copy()
     env.setdefault("OLLAMA_BASE_URL", "http://localhost:11434")
 
-    cmd = [sys.executable, str(SERVER_PY)]
-    # Prefer uv run so deps are correct
-    uv = os.environ.get("UV", "uv")
-    if Path(ROOT / "pyproject.toml").exists():
-        cmd = [uv, "run", "--directory", str(ROOT), "server.py"]
+    # Run the venv interpreter directly (no `uv run` resolve/exec on every run)
+    python = VENV_PY if VENV_PY.exists() else Path(sys.executable)
 
-    proc = subprocess.Popen(
-        cmd,
+    proc = await asyncio.create_subprocess_exec(
+        str(python),
+        str(SERVER_PY),
         cwd=str(ROOT),
-        stdin=subprocess.PIPE,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
         env=env,
-        text=False,
+        limit=1 << 20,
     )
     assert proc.stdin and proc.stdout
 
     errors: list[str] = []
 
     # 1. Initialize
-    init_req = {
-        "jsonrpc": "2.0",
-        "id": 1,
-        "method": "initialize",
-        "params": {
-            "protocolVersion": "2024-11-05",
-            "capabilities": {},
-            "clientInfo": {"name": "integration-test", "version": "0.1.0"},
-        },
-    }
-    init_resp = send_request(proc, init_req)
+    init_resp = await send_request_raw(proc, _INIT_REQ_BYTES)
     if not init_resp:
         errors.append("initialize: no response (timeout or crash)")
     elif "result" not in init_resp and "error" in init_resp:
@@ -116,12 +148,11 @@ def main() -> int:
         print("ok initialize")
 
     # 2. Initialized notification (no id)
-    proc.stdin.write((json.dumps({"jsonrpc": "2.0", "method": "notifications/initialized"}) + "\n").encode("utf-8"))
-    proc.stdin.flush()
+    proc.stdin.write(_INITIALIZED_BYTES)
+    await proc.stdin.drain()
 
     # 3. tools/list
-    list_req = {"jsonrpc": "2.0", "id": 2, "method": "tools/list"}
-    list_resp = send_request(proc, list_req)
+    list_resp = await send_request_raw(proc, _LIST_REQ_BYTES)
     if not list_resp:
         errors.append("tools/list: no response")
     elif "error" in list_resp:
@@ -129,27 +160,14 @@ def main() -> int:
     else:
         tools = list_resp.get("result", {}).get("tools", [])
         names = [t.get("name") for t in tools if t.get("name")]
-        expected = {
-            "ollama_version",
-            "list_models",
-            "list_running_models",
-            "show_model",
-            "chat",
-            "generate",
-            "embed",
-            "copy_model",
-            "pull_model",
-            "delete_model",
-        }
-        missing = expected - set(names)
+        missing = _EXPECTED_TOOLS - set(names)
         if missing:
             errors.append(f"tools/list missing: {missing}")
         else:
             print(f"ok tools/list ({len(names)} tools)")
 
     # 4. tools/call list_models (safe, no side effects)
-    call_req = {"jsonrpc": "2.0", "id": 3, "method": "tools/call", "params": {"name": "list_models", "arguments": {}}}
-    call_resp = send_request(proc, call_req, timeout=max(20, _timeout_default()))
+    call_resp = await send_request_raw(proc, _CALL_LIST_MODELS_BYTES, timeout=max(20, _timeout_default()))
     if not call_resp:
         errors.append("tools/call list_models: no response")
     elif "error" in call_resp:
@@ -163,13 +181,7 @@ def main() -> int:
             print(f"ok tools/call list_models: {text[:80]}...")
 
     # 5. tools/call generate with stream=false (minimal)
-    gen_req = {
-        "jsonrpc": "2.0",
-        "id": 4,
-        "method": "tools/call",
-        "params": {"name": "generate", "arguments": {"model": "llama3.2", "prompt": "Say 1", "stream": False}},
-    }
-    gen_resp = send_request(proc, gen_req, timeout=_generate_timeout())
+    gen_resp = await send_request_raw(proc, _CALL_GENERATE_BYTES, timeout=_generate_timeout())
     if not gen_resp:
         errors.append("tools/call generate: no response (timeout?)")
     elif "error" in gen_resp:
@@ -180,9 +192,10 @@ def main() -> int:
 
     proc.terminate()
     try:
-        proc.wait(timeout=5)
-    except subprocess.TimeoutExpired:
+        await asyncio.wait_for(proc.wait(), 5)
+    except asyncio.TimeoutError:
         proc.kill()
+        await proc.wait()
 
     if errors:
         for e in errors:
@@ -192,5 +205,9 @@ def main() -> int:
     return 0
 
 
+def main() -> int:
+    return asyncio.run(_run())
+
+
 if __name__ == "__main__":
     sys.exit(main())
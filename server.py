@@ -3,14 +3,32 @@ Ollama MCP server: exposes local Ollama API as MCP tools for Cursor, Claude, etc
 Run with: uv run server.py
 Use stderr for logging (stdio is used for MCP protocol).
 """
+import asyncio
+import inspect
 import json
 import logging
 import os
+import sys
+import time
+import types
+import typing
+from collections.abc import AsyncIterator, Awaitable, Callable
+from contextlib import asynccontextmanager
 from pathlib import Path
 from typing import Any
 
+import anyio
+import anyio.to_thread
 import httpx
-from mcp.server.fastmcp import FastMCP
+from mcp.server.fastmcp import Context, FastMCP
+from mcp.server.stdio import stdio_server
+from mcp.types import TextContent
+
+# FastMCP internal used by the fast tools/call dispatch; without it FastMCP's own dispatch is used
+try:
+    from mcp.server.fastmcp.utilities.context_injection import find_context_parameter
+except ImportError:
+    find_context_parameter = None
 
 # Load .env from project root so OLLAMA_BASE_URL etc. can be set there
 try:
@@ -21,6 +39,28 @@ try:
 except ImportError:
     pass
 
+# orjson (optional, `fast` extra) parses/serializes JSON in C; fall back to stdlib json
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+def _json_loads(data: bytes | str) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _json_dumps(obj: Any, *, indent: bool = False) -> str:
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0).decode()
+    # Match orjson's output (compact separators, raw UTF-8) so results don't depend on the extra
+    if indent:
+        return json.dumps(obj, indent=2, ensure_ascii=False)
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False)
+
+
 def _log_level() -> int:
     raw = os.environ.get("OLLAMA_MCP_LOG_LEVEL", "INFO").upper()
     return getattr(logging, raw, logging.INFO)
@@ -54,22 +94,91 @@ def _stream_read_timeout() -> float:
     return _timeout_sec() * 3
 
 
-# Lazy singleton HTTP client (reused for all requests)
-_http_client: httpx.AsyncClient | None = None
+def _connect_timeout() -> float:
+    """Fail fast when Ollama is down instead of waiting out the full request timeout."""
+    raw = os.environ.get("OLLAMA_CONNECT_TIMEOUT", "5")
+    try:
+        return max(0.5, float(raw))
+    except ValueError:
+        return 5.0
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return max(1, int(os.environ.get(name, default)))
+    except ValueError:
+        return default
+
+
+# Large embed inputs are split into sub-batches sent concurrently (bounded)
+EMBED_BATCH_SIZE = _env_int("OLLAMA_EMBED_BATCH_SIZE", 32)
+EMBED_CONCURRENCY = _env_int("OLLAMA_EMBED_CONCURRENCY", 4)
+# Shared by all embed calls so concurrent calls (e.g. in one batch layer) stay within the bound
+_embed_semaphore: asyncio.Semaphore | None = None
+
 
+def _get_embed_semaphore() -> asyncio.Semaphore:
+    global _embed_semaphore
+    if _embed_semaphore is None:
+        _embed_semaphore = asyncio.Semaphore(EMBED_CONCURRENCY)
+    return _embed_semaphore
 
+
+def _http2_enabled() -> bool:
+    """HTTP/2 only applies to https:// (httpx negotiates it via TLS ALPN) and needs the h2 package."""
+    if os.environ.get("OLLAMA_HTTP2", "").lower() not in ("1", "true", "yes"):
+        return False
+    if not OLLAMA_BASE.lower().startswith("https://"):
+        logger.warning("OLLAMA_HTTP2 ignored: HTTP/2 is only negotiated for https:// base URLs")
+        return False
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        logger.warning("OLLAMA_HTTP2 ignored: install the 'http2' extra (h2 package)")
+        return False
+    return True
+
+
+# Lazy singleton HTTP client (reused for all requests; keep-alive pool avoids a new
+# TCP connection to Ollama per tool call)
+_http_client: httpx.AsyncClient | None = None
+_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=16,
+    max_connections=32,
+    keepalive_expiry=60.0,
+)
 async def _get_client() -> httpx.AsyncClient:
     global _http_client
     if _http_client is None:
-        _http_client = httpx.AsyncClient(timeout=_timeout_sec())
+        http2 = _http2_enabled()
+        _http_client = httpx.AsyncClient(
+            base_url=OLLAMA_API,
+            timeout=httpx.Timeout(_timeout_sec(), connect=_connect_timeout()),
+            # Same pool cap with HTTP/2: if the proxy does not negotiate h2 via ALPN, httpx
+            # falls back to HTTP/1.1 and each streamed generation holds its own connection
+            limits=_HTTP_LIMITS,
+            http2=http2,
+        )
     return _http_client
 
 
-mcp = FastMCP("ollama")
+async def _close_client() -> None:
+    global _http_client
+    if _http_client is not None:
+        client, _http_client = _http_client, None
+        await client.aclose()
+
+
+@asynccontextmanager
+async def _lifespan(_server: FastMCP) -> AsyncIterator[None]:
+    """Close the shared HTTP client (and its pooled connections) on shutdown."""
+    try:
+        yield
+    finally:
+        await _close_client()
 
 
-def _api_url(path: str) -> str:
-    return f"{OLLAMA_API.rstrip('/')}/{path.lstrip('/')}"
+mcp = FastMCP("ollama", lifespan=_lifespan)
 
 
 async def _request(
@@ -77,75 +186,188 @@ async def _request(
     path: str,
     **kwargs: Any,
 ) -> dict[str, Any] | list[Any]:
-    url = _api_url(path)
     client = await _get_client()
-    resp = await client.request(method, url, **kwargs)
+    resp = await client.request(method, path, **kwargs)
     resp.raise_for_status()
-    if resp.content:
-        return resp.json()
-    return {}
+    # Parse the raw bytes directly (resp.json() decodes the whole body to str first)
+    body = await resp.aread()
+    return _json_loads(body) if body else {}
 
 
-async def _request_stream(
+async def _aiter_ndjson(resp: httpx.Response) -> AsyncIterator[bytes]:
+    """Yield non-blank NDJSON lines as bytes, splitting a single bytearray buffer
+    (avoids httpx's per-line str decoding in aiter_lines)."""
+    buf = bytearray()
+    async for data in resp.aiter_bytes():
+        buf += data
+        start = 0
+        while (nl := buf.find(b"\n", start)) != -1:
+            line = bytes(buf[start:nl])
+            start = nl + 1
+            # Skip keepalive blank lines without decoding; JSON parsers accept surrounding whitespace
+            if line and not line.isspace():
+                yield line
+        del buf[:start]
+    if buf and not buf.isspace():
+        yield bytes(buf)
+
+
+# Opt-in: pull the content string out of plain token chunks without parsing the whole line
+FAST_STREAM_PARSE = os.environ.get("OLLAMA_MCP_FAST_STREAM_PARSE", "").lower() in ("1", "true", "yes")
+# Chunks that carry more than one content string are left to the full JSON parser
+_FAST_PARSE_SKIP = (b'"thinking"', b'"tool_calls"', b'"done":true')
+
+
+def _fast_fragment(line: bytes, marker: bytes) -> str | None:
+    """Return the string value following marker (e.g. b'"response":"') in an NDJSON line,
+    or None when the line needs a full JSON parse."""
+    start = line.find(marker)
+    if start == -1 or line.find(marker, start + 1) != -1:
+        return None
+    if any(key in line for key in _FAST_PARSE_SKIP):
+        return None
+    start += len(marker)
+    end = line.find(b'"', start)
+    while end != -1:
+        # A quote preceded by an odd number of backslashes is escaped
+        backslashes = 0
+        while line[end - 1 - backslashes] == 0x5C:
+            backslashes += 1
+        if backslashes % 2 == 0:
+            break
+        end = line.find(b'"', end + 1)
+    if end == -1:
+        return None
+    raw = line[start:end]
+    if b"\\" not in raw:
+        return raw.decode("utf-8", errors="replace")
+    try:
+        return _json_loads(b'"' + raw + b'"')
+    except json.JSONDecodeError:
+        return None
+
+
+async def _iter_stream(
     path: str,
     payload: dict[str, Any],
     content_key: str,
-) -> str:
-    """Call a streaming endpoint; accumulate content from each NDJSON chunk and return full text."""
-    url = _api_url(path)
-    payload = {**payload, "stream": True}
-    content_parts: list[str] = []
-    thinking_parts: list[str] = []
+) -> AsyncIterator[tuple[str, str]]:
+    """Call a streaming endpoint and yield ("thinking" | "content", fragment) per NDJSON chunk.
+    The caller owns payload and must already have set "stream": True.
+    """
+    assert payload.get("stream") is True, "caller must set stream=True"
     client = await _get_client()
     stream_timeout = httpx.Timeout(_stream_read_timeout())
-    async with client.stream("POST", url, json=payload, timeout=stream_timeout) as resp:
+    marker = b'"' + content_key.encode() + b'":"' if FAST_STREAM_PARSE else None
+    async with client.stream("POST", path, json=payload, timeout=stream_timeout) as resp:
         resp.raise_for_status()
-        async for line in resp.aiter_lines():
-            line = line.strip()
-            if not line:
-                continue
+        async for line in _aiter_ndjson(resp):
+            if marker is not None:
+                fragment = _fast_fragment(line, marker)
+                if fragment is not None:
+                    yield "content", fragment
+                    continue
             try:
-                chunk = json.loads(line)
+                chunk = _json_loads(line)
             except json.JSONDecodeError:
                 continue
             # Thinking: chat has message.thinking, generate has top-level thinking (avoid double-count)
             msg = chunk.get("message") or {}
             if isinstance(msg, dict) and msg.get("thinking"):
-                thinking_parts.append(msg["thinking"])
+                yield "thinking", msg["thinking"]
             elif chunk.get("thinking"):
-                thinking_parts.append(chunk["thinking"])
+                yield "thinking", chunk["thinking"]
             # Content: chat has message.content, generate has response
             if isinstance(msg, dict) and content_key in msg:
-                content_parts.append(msg[content_key] or "")
+                yield "content", msg[content_key] or ""
             elif content_key in chunk:
-                content_parts.append(chunk[content_key] or "")
+                yield "content", chunk[content_key] or ""
+
+
+async def _request_stream(
+    path: str,
+    payload: dict[str, Any],
+    content_key: str,
+    ctx: Context | None = None,
+) -> str:
+    """Call a streaming endpoint and return the full text.
+    If ctx is given, each fragment is also sent to the client as a progress notification
+    as soon as it arrives (thinking fragments are prefixed with "[Thinking] ").
+    """
+    content_parts: list[str] = []
+    thinking_parts: list[str] = []
+    count = 0
+    async for kind, fragment in _iter_stream(path, payload, content_key):
+        if kind == "thinking":
+            thinking_parts.append(fragment)
+        else:
+            content_parts.append(fragment)
+        if ctx is not None and fragment:
+            count += 1
+            message = f"[Thinking] {fragment}" if kind == "thinking" else fragment
+            await ctx.report_progress(count, message=message)
     content = "".join(content_parts)
     if thinking_parts:
-        content = f"[Thinking] {' '.join(thinking_parts).strip()}\n\n{content}"
+        # Fragments carry their own whitespace; joining with spaces would split words
+        content = f"[Thinking] {''.join(thinking_parts)}\n\n{content}"
     return content
 
 
 async def _request_pull_stream(path: str, payload: dict[str, Any]) -> dict[str, Any]:
-    """Consume pull NDJSON stream and return the last chunk (status, digest, etc.)."""
-    url = _api_url(path)
-    payload = {**payload, "stream": True}
+    """Consume pull NDJSON stream and return the last chunk (status, digest, etc.).
+    The caller must already have set "stream": True in payload.
+    """
+    assert payload.get("stream") is True, "caller must set stream=True"
     client = await _get_client()
     stream_timeout = httpx.Timeout(_stream_read_timeout())
     last: dict[str, Any] = {}
-    async with client.stream("POST", url, json=payload, timeout=stream_timeout) as resp:
+    async with client.stream("POST", path, json=payload, timeout=stream_timeout) as resp:
         resp.raise_for_status()
-        async for line in resp.aiter_lines():
-            line = line.strip()
-            if not line:
-                continue
+        async for line in _aiter_ndjson(resp):
             try:
-                chunk = json.loads(line)
+                chunk = _json_loads(line)
                 last = chunk
             except json.JSONDecodeError:
                 continue
     return last
 
 
+# Short-lived cache for model listings; entries are dropped when we change the model set
+_cache: dict[str, tuple[float, Any]] = {}
+# Bumped on every invalidation so a listing fetched before a change is not stored after it
+_cache_generation = 0
+_TAGS_TTL = 5.0
+_PS_TTL = 2.0
+
+
+async def _cached_request(path: str, ttl: float) -> Any:
+    """GET path, reusing a response younger than ttl seconds."""
+    now = time.monotonic()
+    hit = _cache.get(path)
+    if hit is not None and now - hit[0] < ttl:
+        return hit[1]
+    generation = _cache_generation
+    data = await _request("GET", path)
+    if generation == _cache_generation:
+        _cache[path] = (now, data)
+    return data
+
+
+def _invalidate_model_cache() -> None:
+    """Installed models changed (pull/copy/delete)."""
+    global _cache_generation
+    _cache_generation += 1
+    _cache.pop("tags", None)
+    _cache.pop("ps", None)
+
+
+def _invalidate_running_cache() -> None:
+    """A chat/generate/embed call may have loaded a model."""
+    global _cache_generation
+    _cache_generation += 1
+    _cache.pop("ps", None)
+
+
 def _apply_generation_controls(
     payload: dict[str, Any],
     *,
@@ -165,15 +387,19 @@ def _apply_generation_controls(
 
 # ---- Info ----
 
+async def _ollama_version_impl() -> str:
+    data = await _request("GET", "version")
+    version = data.get("version", "unknown")
+    return f"Ollama is reachable at {OLLAMA_BASE}. Version: {version}"
+
+
 @mcp.tool()
 async def ollama_version() -> str:
     """Check if Ollama is reachable and return its version (e.g. for health checks).
     Fails with a clear message if Ollama is not running or not reachable.
     """
     try:
-        data = await _request("GET", "version")
-        version = data.get("version", "unknown")
-        return f"Ollama is reachable at {OLLAMA_BASE}. Version: {version}"
+        return await _ollama_version_impl()
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}. Is Ollama running at {OLLAMA_BASE}?"
     except Exception as e:
@@ -183,21 +409,25 @@ async def ollama_version() -> str:
 
 # ---- Models ----
 
+async def _list_models_impl() -> str:
+    data = await _cached_request("tags", _TAGS_TTL)
+    models = data.get("models") or []
+    if not models:
+        return "No models installed. Use pull_model to pull a model (e.g. llama3.2)."
+    lines = []
+    for m in models:
+        name = m.get("name", "?")
+        size = m.get("size")
+        size_mb = f"{size / (1024**2):.0f} MB" if size else "?"
+        lines.append(f"- {name} ({size_mb})")
+    return "\n".join(lines)
+
+
 @mcp.tool()
 async def list_models() -> str:
     """List all installed Ollama models (name, size, modified)."""
     try:
-        data = await _request("GET", "tags")
-        models = data.get("models") or []
-        if not models:
-            return "No models installed. Use pull_model to pull a model (e.g. llama3.2)."
-        lines = []
-        for m in models:
-            name = m.get("name", "?")
-            size = m.get("size")
-            size_mb = f"{size / (1024**2):.0f} MB" if size else "?"
-            lines.append(f"- {name} ({size_mb})")
-        return "\n".join(lines)
+        return await _list_models_impl()
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}. Is Ollama running at {OLLAMA_BASE}?"
     except Exception as e:
@@ -205,15 +435,19 @@ async def list_models() -> str:
         return f"Error: {e}"
 
 
+async def _list_running_models_impl() -> str:
+    data = await _cached_request("ps", _PS_TTL)
+    models = data.get("models") or []
+    if not models:
+        return "No models currently loaded."
+    return "\n".join(f"- {m.get('name', '?')}" for m in models)
+
+
 @mcp.tool()
 async def list_running_models() -> str:
     """List models currently loaded in Ollama (running)."""
     try:
-        data = await _request("GET", "ps")
-        models = data.get("models") or []
-        if not models:
-            return "No models currently loaded."
-        return "\n".join(f"- {m.get('name', '?')}" for m in models)
+        return await _list_running_models_impl()
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}"
     except Exception as e:
@@ -221,6 +455,11 @@ async def list_running_models() -> str:
         return f"Error: {e}"
 
 
+async def _show_model_impl(model: str) -> str:
+    data = await _request("POST", "show", json={"name": model})
+    return _json_dumps(data, indent=True)
+
+
 @mcp.tool()
 async def show_model(model: str) -> str:
     """Get details for an installed model (parameters, family, size, etc.).
@@ -228,8 +467,7 @@ async def show_model(model: str) -> str:
         model: Model name (e.g. llama3.2, gemma3).
     """
     try:
-        data = await _request("POST", "show", json={"name": model})
-        return json.dumps(data, indent=2)
+        return await _show_model_impl(model)
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}"
     except Exception as e:
@@ -239,6 +477,41 @@ async def show_model(model: str) -> str:
 
 # ---- Chat & Generate ----
 
+async def _chat_impl(
+    model: str,
+    messages: list[dict[str, str]],
+    stream: bool = False,
+    options: dict[str, Any] | None = None,
+    format: str | dict[str, Any] | None = None,
+    keep_alive: str | None = None,
+    ctx: Context | None = None,
+) -> str:
+    payload = _apply_generation_controls(
+        {"model": model, "messages": messages},
+        options=options,
+        format=format,
+        keep_alive=keep_alive,
+    )
+    if stream:
+        payload["stream"] = True
+        content = await _request_stream(
+            "chat",
+            payload,
+            content_key="content",
+            ctx=ctx,
+        )
+        _invalidate_running_cache()
+        return content
+    payload["stream"] = False
+    data = await _request("POST", "chat", json=payload)
+    _invalidate_running_cache()
+    msg = data.get("message") or {}
+    content = msg.get("content") or ""
+    if msg.get("thinking"):
+        content = f"[Thinking] {msg.get('thinking')}\n\n{content}"
+    return content
+
+
 @mcp.tool()
 async def chat(
     model: str,
@@ -247,36 +520,19 @@ async def chat(
     options: dict[str, Any] | None = None,
     format: str | dict[str, Any] | None = None,
     keep_alive: str | None = None,
+    ctx: Context | None = None,
 ) -> str:
     """Generate the next assistant message for a conversation (multi-turn).
     Args:
         model: Model name (e.g. llama3.2, gemma3).
         messages: List of message objects with 'role' and 'content', e.g. [{"role":"user","content":"Hello"}].
-        stream: If true, Ollama streams tokens (we accumulate and return the full reply). If false, Ollama returns one JSON response.
+        stream: If true, Ollama streams tokens; each one is forwarded as an MCP progress notification (when the client sends a progress token) and the full reply is returned at the end. If false, Ollama returns one JSON response.
         options: Optional Ollama runtime options (for example temperature, seed, num_ctx).
         format: Optional response format. Use "json" or a JSON schema object for structured outputs.
         keep_alive: Optional Ollama keep_alive value (for example "30m" or "0").
     """
     try:
-        payload = _apply_generation_controls(
-            {"model": model, "messages": messages},
-            options=options,
-            format=format,
-            keep_alive=keep_alive,
-        )
-        if stream:
-            return await _request_stream(
-                "chat",
-                payload,
-                content_key="content",
-            )
-        payload["stream"] = False
-        data = await _request("POST", "chat", json=payload)
-        msg = data.get("message") or {}
-        content = msg.get("content") or ""
-        if msg.get("thinking"):
-            content = f"[Thinking] {msg.get('thinking')}\n\n{content}"
-        return content
+        return await _chat_impl(model, messages, stream, options, format, keep_alive, ctx)
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}"
     except Exception as e:
@@ -284,6 +540,38 @@ async def chat(
         return f"Error: {e}"
 
 
+async def _generate_impl(
+    model: str,
+    prompt: str,
+    system: str | None = None,
+    stream: bool = False,
+    options: dict[str, Any] | None = None,
+    format: str | dict[str, Any] | None = None,
+    keep_alive: str | None = None,
+    ctx: Context | None = None,
+) -> str:
+    payload = _apply_generation_controls(
+        {"model": model, "prompt": prompt},
+        options=options,
+        format=format,
+        keep_alive=keep_alive,
+    )
+    if system:
+        payload["system"] = system
+    if stream:
+        payload["stream"] = True
+        response = await _request_stream("generate", payload, content_key="response", ctx=ctx)
+        _invalidate_running_cache()
+        return response
+    payload["stream"] = False
+    data = await _request("POST", "generate", json=payload)
+    _invalidate_running_cache()
+    response = data.get("response") or ""
+    if data.get("thinking"):
+        response = f"[Thinking] {data.get('thinking')}\n\n{response}"
+    return response
+
+
 @mcp.tool()
 async def generate(
     model: str,
@@ -293,34 +581,20 @@ async def generate(
     options: dict[str, Any] | None = None,
     format: str | dict[str, Any] | None = None,
     keep_alive: str | None = None,
+    ctx: Context | None = None,
 ) -> str:
     """Generate a completion for a single prompt (no conversation history).
     Args:
         model: Model name (e.g. llama3.2, gemma3).
         prompt: The user prompt text.
         system: Optional system prompt.
-        stream: If true, Ollama streams tokens (we accumulate and return the full reply). If false, Ollama returns one JSON response.
+        stream: If true, Ollama streams tokens; each one is forwarded as an MCP progress notification (when the client sends a progress token) and the full reply is returned at the end. If false, Ollama returns one JSON response.
         options: Optional Ollama runtime options (for example temperature, seed, num_ctx).
         format: Optional response format. Use "json" or a JSON schema object for structured outputs.
         keep_alive: Optional Ollama keep_alive value (for example "30m" or "0").
     """
     try:
-        payload = _apply_generation_controls(
-            {"model": model, "prompt": prompt},
-            options=options,
-            format=format,
-            keep_alive=keep_alive,
-        )
-        if system:
-            payload["system"] = system
-        if stream:
-            return await _request_stream("generate", payload, content_key="response")
-        payload["stream"] = False
-        data = await _request("POST", "generate", json=payload)
-        response = data.get("response") or ""
-        if data.get("thinking"):
-            response = f"[Thinking] {data.get('thinking')}\n\n{response}"
-        return response
+        return await _generate_impl(model, prompt, system, stream, options, format, keep_alive, ctx)
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}"
     except Exception as e:
@@ -330,19 +604,35 @@ async def generate(
 
 # ---- Embeddings ----
 
+async def _embed_impl(model: str, text: str | list[str]) -> str:
+    inputs = [text] if isinstance(text, str) else text
+    if len(inputs) <= EMBED_BATCH_SIZE:
+        data = await _request("POST", "embed", json={"model": model, "input": inputs})
+        embeddings = data.get("embeddings") or []
+    else:
+        sem = _get_embed_semaphore()
+
+        async def _embed_chunk(chunk: list[str]) -> list[Any]:
+            async with sem:
+                data = await _request("POST", "embed", json={"model": model, "input": chunk})
+            return data.get("embeddings") or []
+
+        chunks = [inputs[i:i + EMBED_BATCH_SIZE] for i in range(0, len(inputs), EMBED_BATCH_SIZE)]
+        embeddings = [e for part in await asyncio.gather(*map(_embed_chunk, chunks)) for e in part]
+    _invalidate_running_cache()
+    return _json_dumps({"embeddings": embeddings, "count": len(embeddings)})
+
+
 @mcp.tool()
 async def embed(model: str, text: str | list[str]) -> str:
     """Get embeddings for text. Text can be a string or list of strings.
     Args:
         model: Embedding model name (e.g. nomic-embed-text).
-        text: Single string or list of strings to embed.
+        text: Single string or list of strings to embed. Long lists are split into
+            sub-batches of OLLAMA_EMBED_BATCH_SIZE sent concurrently; order is preserved.
     """
     try:
-        inputs = [text] if isinstance(text, str) else text
-        payload = {"model": model, "input": inputs}
-        data = await _request("POST", "embed", json=payload)
-        embeddings = data.get("embeddings") or []
-        return json.dumps({"embeddings": embeddings, "count": len(embeddings)})
+        return await _embed_impl(model, text)
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}"
     except Exception as e:
@@ -352,6 +642,12 @@ async def embed(model: str, text: str | list[str]) -> str:
 
 # ---- Model lifecycle ----
 
+async def _copy_model_impl(source: str, destination: str) -> str:
+    await _request("POST", "copy", json={"source": source, "destination": destination})
+    _invalidate_model_cache()
+    return f"Copied model '{source}' to '{destination}'."
+
+
 @mcp.tool()
 async def copy_model(source: str, destination: str) -> str:
     """Copy an existing model to a new name (e.g. for a backup or variant).
@@ -360,8 +656,7 @@ async def copy_model(source: str, destination: str) -> str:
         destination: New model name to create.
     """
     try:
-        await _request("POST", "copy", json={"source": source, "destination": destination})
-        return f"Copied model '{source}' to '{destination}'."
+        return await _copy_model_impl(source, destination)
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}"
     except Exception as e:
@@ -369,6 +664,20 @@ async def copy_model(source: str, destination: str) -> str:
         return f"Error: {e}"
 
 
+async def _pull_model_impl(name: str, insecure: bool = False) -> str:
+    payload: dict[str, Any] = {"name": name, "stream": True}
+    if insecure:
+        payload["insecure"] = True
+    data = await _request_pull_stream("pull", payload)
+    _invalidate_model_cache()
+    status = data.get("status", "unknown")
+    digest = data.get("digest", "")
+    out = f"Pull finished: {status}."
+    if digest:
+        out += f" (digest: {digest[:16]}...)" if len(digest) > 16 else f" (digest: {digest})"
+    return out
+
+
 @mcp.tool()
 async def pull_model(name: str, insecure: bool = False) -> str:
     """Pull a model from the registry (e.g. llama3.2, gemma3). Consumes the full stream and returns the final status.
@@ -377,16 +686,7 @@ async def pull_model(name: str, insecure: bool = False) -> str:
         insecure: Allow insecure connections to the registry.
     """
     try:
-        payload: dict[str, Any] = {"name": name}
-        if insecure:
-            payload["insecure"] = True
-        data = await _request_pull_stream("pull", payload)
-        status = data.get("status", "unknown")
-        digest = data.get("digest", "")
-        out = f"Pull finished: {status}."
-        if digest:
-            out += f" (digest: {digest[:16]}...)" if len(digest) > 16 else f" (digest: {digest})"
-        return out
+        return await _pull_model_impl(name, insecure)
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}"
     except Exception as e:
@@ -394,6 +694,12 @@ async def pull_model(name: str, insecure: bool = False) -> str:
         return f"Error: {e}"
 
 
+async def _delete_model_impl(name: str) -> str:
+    await _request("DELETE", "delete", json={"name": name})
+    _invalidate_model_cache()
+    return f"Deleted model: {name}"
+
+
 @mcp.tool()
 async def delete_model(name: str) -> str:
     """Delete an installed model from Ollama.
@@ -401,8 +707,7 @@ async def delete_model(name: str) -> str:
         name: Exact model name to delete.
     """
     try:
-        await _request("DELETE", "delete", json={"name": name})
-        return f"Deleted model: {name}"
+        return await _delete_model_impl(name)
     except httpx.HTTPError as e:
         return f"Ollama request failed: {e}"
     except Exception as e:
@@ -410,8 +715,317 @@ async def delete_model(name: str) -> str:
         return f"Error: {e}"
 
 
+# ---- Batch ----
+
+# Tool name -> implementation (raises on failure, unlike the text-returning tools),
+# built once at import for routers like batch
+_TOOL_DISPATCH: dict[str, Callable[..., Awaitable[str]]] = {
+    "ollama_version": _ollama_version_impl,
+    "list_models": _list_models_impl,
+    "list_running_models": _list_running_models_impl,
+    "show_model": _show_model_impl,
+    "chat": _chat_impl,
+    "generate": _generate_impl,
+    "embed": _embed_impl,
+    "copy_model": _copy_model_impl,
+    "pull_model": _pull_model_impl,
+    "delete_model": _delete_model_impl,
+}
+
+
+def _set_path(args: dict[str, Any], path: str, value: Any) -> None:
+    """Set value at a dotted path inside args, e.g. "prompt" or "messages.0.content".
+    Raises ValueError unless every step is an object key or an existing list index."""
+    *parents, last = path.split(".")
+    target: Any = args
+    for key in parents:
+        if isinstance(target, dict):
+            target = target.setdefault(key, {})
+        elif isinstance(target, list) and key.isdigit() and int(key) < len(target):
+            target = target[int(key)]
+        else:
+            raise ValueError(f"cannot descend into {key!r} of {path!r}")
+    if isinstance(target, dict):
+        target[last] = value
+    elif isinstance(target, list) and last.isdigit() and int(last) < len(target):
+        target[int(last)] = value
+    else:
+        raise ValueError(f"cannot set {last!r} of {path!r}")
+
+
+def _is_call_id(value: Any) -> bool:
+    return isinstance(value, (str, int)) and not isinstance(value, bool)
+
+
+def _batch_layers(calls: list[dict[str, Any]]) -> list[list[dict[str, Any]]]:
+    """Group calls into layers where each call only depends on calls in earlier layers."""
+    by_id: dict[Any, dict[str, Any]] = {}
+    for call in calls:
+        if "id" not in call or "tool" not in call:
+            raise ValueError("each call needs 'id' and 'tool'")
+        cid = call["id"]
+        if not _is_call_id(cid):
+            raise ValueError(f"call {cid!r}: 'id' must be a string or integer")
+        if cid in by_id:
+            raise ValueError(f"duplicate call id {cid!r}")
+        if not isinstance(call["tool"], str) or call["tool"] not in _TOOL_DISPATCH:
+            raise ValueError(f"unknown tool {call['tool']!r}")
+        if not isinstance(call.get("args") or {}, dict):
+            raise ValueError(f"call {cid!r}: 'args' must be an object")
+        parent, path = call.get("input_from"), call.get("input_path")
+        if parent is None:
+            if path is not None:
+                raise ValueError(f"call {cid!r}: input_path requires input_from")
+        elif not _is_call_id(parent):
+            raise ValueError(f"call {cid!r}: 'input_from' must be a string or integer")
+        elif not path or not isinstance(path, str):
+            raise ValueError(f"call {cid!r}: input_from requires input_path")
+        by_id[cid] = call
+    depth: dict[Any, int] = {}
+
+    def _depth(cid: Any, seen: tuple[Any, ...] = ()) -> int:
+        if cid in depth:
+            return depth[cid]
+        if cid in seen:
+            raise ValueError(f"dependency cycle through call {cid!r}")
+        parent = by_id[cid].get("input_from")
+        if parent is None:
+            depth[cid] = 0
+        elif parent not in by_id:
+            raise ValueError(f"call {cid!r}: input_from {parent!r} does not exist")
+        else:
+            depth[cid] = _depth(parent, (*seen, cid)) + 1
+        return depth[cid]
+
+    for call in calls:
+        _depth(call["id"])
+    layers: list[list[dict[str, Any]]] = [[] for _ in range(max(depth.values(), default=-1) + 1)]
+    for call in calls:
+        layers[depth[call["id"]]].append(call)
+    return layers
+
+
+async def _run_batch_call(call: dict[str, Any], results: dict[Any, dict[str, Any]]) -> dict[str, Any]:
+    out: dict[str, Any] = {"id": call["id"], "tool": call["tool"]}
+    args = dict(call.get("args") or {})
+    parent = call.get("input_from")
+    if parent is not None:
+        dep = results[parent]
+        if not dep["ok"]:
+            return {**out, "ok": False, "error": f"dependency {parent!r} failed"}
+        try:
+            _set_path(args, call["input_path"], dep["result"])
+        except ValueError as e:
+            return {**out, "ok": False, "error": f"invalid input_path: {e}"}
+    fn = _TOOL_DISPATCH[call["tool"]]
+    try:
+        inspect.signature(fn).bind(**args)
+    except TypeError as e:
+        return {**out, "ok": False, "error": f"invalid arguments: {e}"}
+    try:
+        result = await fn(**args)
+    except httpx.HTTPError as e:
+        return {**out, "ok": False, "error": f"Ollama request failed: {e}"}
+    except Exception as e:
+        logger.exception(call["tool"])
+        return {**out, "ok": False, "error": f"Error: {e}"}
+    return {**out, "ok": True, "result": result}
+
+
+@mcp.tool()
+async def batch(calls: list[dict[str, Any]]) -> str:
+    """Run several tool calls in one request. Independent calls run concurrently;
+    a call with input_from waits for that call and receives its text output.
+    Args:
+        calls: List of {"id", "tool", "args", "input_from", "input_path"} objects.
+            id: Unique id for the call. tool: Tool name (e.g. list_models, generate). args: Tool arguments.
+            input_from: Optional id of another call whose output is passed into this call.
+            input_path: Argument (dotted path, e.g. "prompt" or "messages.0.content") that receives it.
+        Calls whose dependency failed are skipped with an error. Returns a JSON list of results in input order.
+    """
+    try:
+        layers = _batch_layers(calls)
+        results: dict[Any, dict[str, Any]] = {}
+        for layer in layers:
+            done = await asyncio.gather(*(_run_batch_call(c, results) for c in layer))
+            for r in done:
+                results[r["id"]] = r
+        return _json_dumps([results[c["id"]] for c in calls], indent=True)
+    except ValueError as e:
+        return f"Error: invalid batch: {e}"
+    except Exception as e:
+        logger.exception("batch")
+        return f"Error: {e}"
+
+
+# ---- Fast tools/call dispatch ----
+
+def _value_checker(annotation: Any) -> Callable[[Any], bool] | None:
+    """Build an isinstance-based check for a parameter annotation (the JSON shapes our
+    tools use), or None if the annotation needs FastMCP's full pydantic validation."""
+    if annotation is Any:
+        return lambda v: True
+    if annotation is type(None):
+        return lambda v: v is None
+    if annotation is bool:
+        return lambda v: type(v) is bool
+    if annotation in (str, list, dict):
+        return lambda v: isinstance(v, annotation)
+    origin, args = typing.get_origin(annotation), typing.get_args(annotation)
+    if origin in (typing.Union, types.UnionType):
+        checks = [_value_checker(a) for a in args]
+        if None in checks:
+            return None
+        return lambda v: any(check(v) for check in checks)
+    if origin is list and len(args) == 1:
+        item = _value_checker(args[0])
+        if item is None:
+            return None
+        return lambda v: isinstance(v, list) and all(map(item, v))
+    if origin is dict and len(args) == 2:
+        key, val = _value_checker(args[0]), _value_checker(args[1])
+        if key is None or val is None:
+            return None
+        return lambda v: isinstance(v, dict) and all(key(k) and val(x) for k, x in v.items())
+    return None
+
+
+def _compile_arg_binder(fn: Callable[..., Any]) -> Callable[[dict[str, Any]], dict[str, Any] | None] | None:
+    """Precompute a tool's parameter checks once. The returned binder gives the kwargs to
+    call fn with, or None when the arguments are not already well-typed (FastMCP then
+    validates/coerces them and reports errors as usual)."""
+    hints = typing.get_type_hints(fn)
+    ctx_kwarg = find_context_parameter(fn)
+    checks: dict[str, Callable[[Any], bool]] = {}
+    required: set[str] = set()
+    for name, param in inspect.signature(fn).parameters.items():
+        if name == ctx_kwarg:
+            continue
+        check = _value_checker(hints.get(name, Any))
+        if check is None:
+            return None
+        checks[name] = check
+        if param.default is inspect.Parameter.empty:
+            required.add(name)
+
+    def bind(arguments: dict[str, Any]) -> dict[str, Any] | None:
+        if not required.issubset(arguments):
+            return None
+        for name, value in arguments.items():
+            check = checks.get(name)
+            if check is None or not check(value):
+                return None
+        kwargs = dict(arguments)
+        if ctx_kwarg is not None:
+            kwargs[ctx_kwarg] = mcp.get_context()
+        return kwargs
+
+    return bind
+
+
+def _build_fast_dispatch() -> dict[
+    str, tuple[Callable[..., Awaitable[str]], Callable[[dict[str, Any]], dict[str, Any] | None]]
+]:
+    dispatch = {}
+    if find_context_parameter is None:
+        return dispatch
+    tools = (
+        ollama_version,
+        list_models,
+        list_running_models,
+        show_model,
+        chat,
+        generate,
+        embed,
+        copy_model,
+        pull_model,
+        delete_model,
+        batch,
+    )
+    for fn in tools:
+        binder = _compile_arg_binder(fn)
+        if binder is not None:
+            dispatch[fn.__name__] = (fn, binder)
+    return dispatch
+
+
+_FAST_DISPATCH = _build_fast_dispatch()
+
+
+async def _call_tool(name: str, arguments: dict[str, Any]) -> Any:
+    """tools/call handler: well-typed calls go straight to the tool function; anything
+    else (unknown tool, missing or mistyped arguments) takes FastMCP's generic path."""
+    fast = _FAST_DISPATCH.get(name)
+    if fast is not None:
+        fn, bind = fast
+        kwargs = bind(arguments)
+        if kwargs is not None:
+            result = await fn(**kwargs)
+            # Same shape FastMCP produces for a `-> str` tool (text content + structured result)
+            return [TextContent(type="text", text=result)], {"result": result}
+    return await mcp.call_tool(name, arguments)
+
+
+def _install_call_tool_handler() -> bool:
+    """Replace the tools/call handler FastMCP registered on its private low-level server
+    (mcp._mcp_server, mcp 1.x); tools/list etc. are unchanged. If that hook is missing,
+    keep FastMCP's own dispatch."""
+    register = getattr(getattr(mcp, "_mcp_server", None), "call_tool", None)
+    if not _FAST_DISPATCH or register is None:
+        logger.warning("Fast tools/call dispatch unavailable with this mcp version; using FastMCP's")
+        return False
+    try:
+        register(validate_input=False)(_call_tool)
+    except TypeError:
+        logger.warning("Fast tools/call dispatch unavailable with this mcp version; using FastMCP's")
+        return False
+    return True
+
+
+_install_call_tool_handler()
+
+
+class _StdinLines:
+    """Async line iterator over a file descriptor for mcp's stdio_server.
+    Each blocking read (one worker-thread hop) takes up to 64 KiB, and every complete
+    line in it is yielded before reading again, so messages a client pipelines arrive
+    with one wakeup instead of one per line. Lines are bytes (pydantic parses them as-is).
+    """
+
+    def __init__(self, fd: int, chunk_size: int = 65536) -> None:
+        self._fd = fd
+        self._chunk_size = chunk_size
+
+    async def __aiter__(self) -> AsyncIterator[bytes]:
+        buf = bytearray()
+        while data := await anyio.to_thread.run_sync(os.read, self._fd, self._chunk_size):
+            buf += data
+            start = 0
+            while (nl := buf.find(b"\n", start)) != -1:
+                line = bytes(buf[start:nl])
+                start = nl + 1
+                if line and not line.isspace():
+                    yield line
+            del buf[:start]
+        if buf and not buf.isspace():
+            yield bytes(buf)
+
+
+async def _run_stdio() -> None:
+    """Same as FastMCP.run_stdio_async, but with the draining stdin reader."""
+    async with stdio_server(stdin=_StdinLines(sys.stdin.fileno())) as (read_stream, write_stream):
+        server = mcp._mcp_server
+        await server.run(read_stream, write_stream, server.create_initialization_options())
+
+
 def main() -> None:
-    mcp.run(transport="stdio")
+    # uvloop (optional, `fast` extra) is a faster asyncio event loop
+    try:
+        import uvloop  # noqa: F401
+        use_uvloop = True
+    except ImportError:
+        use_uvloop = False
+    anyio.run(_run_stdio, backend_options={"use_uvloop": use_uvloop})
 
 
 if __name__ == "__main__":
@@ -16,6 +16,14 @@ def set_ollama_base_url(monkeypatch: pytest.MonkeyPatch) -> None:
     monkeypatch.setenv("OLLAMA_BASE_URL", "http://test-ollama:11434")
 
 
+@pytest.fixture(autouse=True)
+def clear_model_cache() -> None:
+    """Start each test without cached list_models / list_running_models responses."""
+    import server
+
+    server._cache.clear()
+
+
 @pytest.fixture
 def anyio_backend() -> str:
     """Use asyncio for pytest-asyncio."""
@@ -1,23 +1,21 @@
 """Unit tests for streaming Ollama responses (_request_stream)."""
-from unittest.mock import patch
-
 import pytest
 
 import server
 
 
 class _StreamResponse:
-    """Minimal stream response with aiter_lines and raise_for_status."""
+    """Minimal stream response with aiter_bytes and raise_for_status."""
 
-    def __init__(self, lines: list[str]) -> None:
-        self._lines = lines
+    def __init__(self, lines: list[str], chunks: list[bytes] | None = None) -> None:
+        self._chunks = chunks if chunks is not None else [(line + "\n").encode() for line in lines]
 
     def raise_for_status(self) -> None:
         pass
 
-    async def aiter_lines(self) -> list[str]:
-        for line in self._lines:
-            yield line
+    async def aiter_bytes(self) -> list[bytes]:
+        for chunk in self._chunks:
+            yield chunk
 
 
 class _StreamCM:
@@ -38,67 +36,162 @@ class _MockClient:
     def stream(self, *args: object, **kwargs: object) -> _StreamCM:
         return _StreamCM(self._stream_resp)
 
-    async def __aenter__(self) -> "_MockClient":
-        return self
-
-    async def __aexit__(self, *args: object) -> None:
-        pass
-
 
 def _make_client(stream_lines: list[str]) -> _MockClient:
     return _MockClient(_StreamResponse(stream_lines))
 
 
 @pytest.mark.asyncio
-async def test_request_stream_accumulates_content() -> None:
+async def test_request_stream_accumulates_content(monkeypatch: pytest.MonkeyPatch) -> None:
     """Streaming generate-style NDJSON: each chunk has 'response'."""
-    server._http_client = None  # force _get_client() to create a new client (our mock)
     lines = [
         '{"model":"m","response":"Hello","done":false}',
         '{"model":"m","response":" world","done":false}',
         '{"model":"m","response":"!","done":true}',
     ]
-    with patch.object(server, "_api_url", return_value="http://test/api/generate"):
-        with patch("httpx.AsyncClient", return_value=_make_client(lines)):
-            out = await server._request_stream(
-                "generate",
-                {"model": "m", "prompt": "Hi"},
-                content_key="response",
-            )
+    monkeypatch.setattr(server, "_http_client", _make_client(lines))
+    out = await server._request_stream(
+        "generate",
+        {"model": "m", "prompt": "Hi", "stream": True},
+        content_key="response",
+    )
     assert out == "Hello world!"
 
 
 @pytest.mark.asyncio
-async def test_request_stream_chat_message_content() -> None:
+async def test_request_stream_chat_message_content(monkeypatch: pytest.MonkeyPatch) -> None:
     """Streaming chat: each chunk has message.content."""
-    server._http_client = None
     lines = [
         '{"model":"m","message":{"content":"Hi","role":"assistant"},"done":false}',
         '{"model":"m","message":{"content":" there","role":"assistant"},"done":true}',
     ]
-    with patch.object(server, "_api_url", return_value="http://test/api/chat"):
-        with patch("httpx.AsyncClient", return_value=_make_client(lines)):
-            out = await server._request_stream(
-                "chat",
-                {"model": "m", "messages": [{"role": "user", "content": "Say hi"}]},
-                content_key="content",
-            )
+    monkeypatch.setattr(server, "_http_client", _make_client(lines))
+    out = await server._request_stream(
+        "chat",
+        {"model": "m", "messages": [{"role": "user", "content": "Say hi"}], "stream": True},
+        content_key="content",
+    )
     assert out == "Hi there"
 
 
 @pytest.mark.asyncio
-async def test_request_stream_includes_thinking() -> None:
+async def test_request_stream_includes_thinking(monkeypatch: pytest.MonkeyPatch) -> None:
     """Thinking from generate (top-level) is prepended."""
-    server._http_client = None
     lines = [
         '{"model":"m","thinking":"Hmm","response":"","done":false}',
         '{"model":"m","response":"Yes.","done":true}',
     ]
-    with patch.object(server, "_api_url", return_value="http://test/api/generate"):
-        with patch("httpx.AsyncClient", return_value=_make_client(lines)):
-            out = await server._request_stream(
-                "generate",
-                {"model": "m", "prompt": "?"},
-                content_key="response",
-            )
+    monkeypatch.setattr(server, "_http_client", _make_client(lines))
+    out = await server._request_stream(
+        "generate",
+        {"model": "m", "prompt": "?", "stream": True},
+        content_key="response",
+    )
     assert "[Thinking]" in out and "Hmm" in out and "Yes." in out
+
+
+@pytest.mark.asyncio
+async def test_request_stream_joins_thinking_without_extra_spaces(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Thinking fragments are token pieces; they are concatenated as-is."""
+    lines = [
+        '{"model":"m","message":{"thinking":"Let","content":""},"done":false}',
+        '{"model":"m","message":{"thinking":"\'s see","content":""},"done":false}',
+        '{"model":"m","message":{"content":"Ok"},"done":true}',
+    ]
+    monkeypatch.setattr(server, "_http_client", _make_client(lines))
+    out = await server._request_stream(
+        "chat",
+        {"model": "m", "messages": [], "stream": True},
+        content_key="content",
+    )
+    assert out == "[Thinking] Let's see\n\nOk"
+
+
+class _ProgressCtx:
+    """Records report_progress calls like a FastMCP Context."""
+
+    def __init__(self) -> None:
+        self.messages: list[str | None] = []
+
+    async def report_progress(
+        self, progress: float, total: float | None = None, message: str | None = None
+    ) -> None:
+        self.messages.append(message)
+
+
+@pytest.mark.asyncio
+async def test_request_stream_reports_progress_per_fragment(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Each fragment is sent to ctx as it arrives; thinking is tagged."""
+    lines = [
+        '{"model":"m","thinking":"Hmm","response":"","done":false}',
+        '{"model":"m","response":"Hello","done":false}',
+        '{"model":"m","response":" world","done":true}',
+    ]
+    ctx = _ProgressCtx()
+    monkeypatch.setattr(server, "_http_client", _make_client(lines))
+    out = await server._request_stream(
+        "generate",
+        {"model": "m", "prompt": "Hi", "stream": True},
+        content_key="response",
+        ctx=ctx,
+    )
+    assert ctx.messages == ["[Thinking] Hmm", "Hello", " world"]
+    assert out.endswith("Hello world")
+
+
+@pytest.mark.asyncio
+async def test_aiter_ndjson_splits_across_chunk_boundaries() -> None:
+    """Lines split over several reads, blank keepalives and an unterminated tail."""
+    resp = _StreamResponse([], chunks=[b'{"a":', b'1}\n\n  \n{"b"', b':2}\r\n{"c":3}'])
+    lines = [line async for line in server._aiter_ndjson(resp)]
+    assert lines == [b'{"a":1}', b'{"b":2}\r', b'{"c":3}']
+    assert [server._json_loads(line) for line in lines] == [{"a": 1}, {"b": 2}, {"c": 3}]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        '{"model":"m","response":"Hello","done":false}',
+        '{"model":"m","response":"say \\"hi\\"\\n","done":false}',
+        '{"model":"m","response":"back\\\\slash\\\\","done":false}',
+        '{"model":"m","response":"caf\\u00e9 \\ud83d\\ude00","done":false}',
+        '{"model":"m","response":"naïve","done":false}',
+        '{"model":"m","response":"","done":false}',
+    ],
+)
+def test_fast_fragment_matches_json_parse(line: str) -> None:
+    raw = line.encode()
+    assert server._fast_fragment(raw, b'"response":"') == server._json_loads(raw)["response"]
+
+
+@pytest.mark.parametrize(
+    "line",
+    [
+        '{"model":"m","thinking":"Hmm","response":"","done":false}',
+        '{"model":"m","response":"!","done":true,"eval_count":3}',
+        '{"model":"m","message":{"role":"assistant","content":"","tool_calls":[]},"done":false}',
+        '{"model":"m","response": "spaced","done":false}',
+    ],
+)
+def test_fast_fragment_falls_back(line: str) -> None:
+    raw = line.encode()
+    assert server._fast_fragment(raw, b'"response":"') is None
+    assert server._fast_fragment(raw, b'"content":"') is None
+
+
+@pytest.mark.asyncio
+async def test_request_stream_fast_parse_matches(monkeypatch: pytest.MonkeyPatch) -> None:
+    """With the fast path enabled, output is the same as the full JSON parse."""
+    monkeypatch.setattr(server, "FAST_STREAM_PARSE", True)
+    lines = [
+        '{"model":"m","message":{"role":"assistant","thinking":"Hmm","content":""},"done":false}',
+        '{"model":"m","message":{"role":"assistant","content":"Hi \\"you\\""},"done":false}',
+        '{"model":"m","message":{"role":"assistant","content":"!"},"done":true}',
+    ]
+    monkeypatch.setattr(server, "_http_client", _make_client(lines))
+    out = await server._request_stream(
+        "chat",
+        {"model": "m", "messages": [], "stream": True},
+        content_key="content",
+    )
+    assert out == '[Thinking] Hmm\n\nHi "you"!'
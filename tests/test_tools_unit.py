@@ -2,6 +2,7 @@
 import json
 from unittest.mock import AsyncMock, patch
 
+import httpx
 import pytest
 
 # Import after conftest may have set env; we patch _request so no real I/O.
@@ -61,6 +62,52 @@ async def test_list_models_http_error() -> None:
     assert "Ollama request failed" in out
 
 
+@pytest.mark.asyncio
+async def test_list_models_cached_until_model_set_changes() -> None:
+    with patch.object(
+        server, "_request", new_callable=AsyncMock, return_value={"models": [{"name": "llama3.2"}]}
+    ) as m:
+        first = await server.list_models()
+        second = await server.list_models()
+        assert first == second and m.await_count == 1
+        await server.delete_model("gemma3")
+        await server.list_models()
+    assert [c.args[1] for c in m.await_args_list] == ["tags", "delete", "tags"]
+
+
+@pytest.mark.asyncio
+async def test_generate_invalidates_running_models_cache() -> None:
+    with patch.object(server, "_request", new_callable=AsyncMock, return_value={"models": []}):
+        assert "No models currently loaded" in await server.list_running_models()
+    with patch.object(server, "_request", new_callable=AsyncMock, return_value={"response": "ok"}):
+        await server.generate("llama3.2", "Hi")
+    with patch.object(
+        server, "_request", new_callable=AsyncMock, return_value={"models": [{"name": "llama3.2"}]}
+    ):
+        assert "llama3.2" in await server.list_running_models()
+
+
+@pytest.mark.asyncio
+async def test_cached_request_skips_write_after_concurrent_invalidation() -> None:
+    async def slow_tags(method: str, path: str, **kwargs: object) -> dict:
+        server._invalidate_model_cache()  # e.g. delete_model finishing mid-request
+        return {"models": [{"name": "deleted"}]}
+
+    with patch.object(server, "_request", new_callable=AsyncMock, side_effect=slow_tags):
+        await server.list_models()
+    assert "tags" not in server._cache
+
+
+@pytest.mark.asyncio
+async def test_list_models_error_not_cached() -> None:
+    import httpx
+    with patch.object(server, "_request", new_callable=AsyncMock, side_effect=httpx.ConnectError("nope")):
+        await server.list_models()
+    with patch.object(server, "_request", new_callable=AsyncMock, return_value={"models": []}):
+        out = await server.list_models()
+    assert "No models installed" in out
+
+
 @pytest.mark.asyncio
 async def test_list_running_models_empty() -> None:
     with patch.object(server, "_request", new_callable=AsyncMock, return_value={"models": []}):
@@ -206,9 +253,10 @@ async def test_generate_stream() -> None:
     async def mock_stream(*args: object, **kwargs: object) -> str:
         return "Streamed generate"
 
-    with patch.object(server, "_request_stream", new_callable=AsyncMock, side_effect=mock_stream):
+    with patch.object(server, "_request_stream", new_callable=AsyncMock, side_effect=mock_stream) as m:
         out = await server.generate("llama3.2", "Hi", stream=True)
     assert out == "Streamed generate"
+    assert m.call_args.args[1]["stream"] is True
 
 
 @pytest.mark.asyncio
@@ -238,6 +286,46 @@ async def test_embed_list_of_strings() -> None:
     assert call.kwargs.get("json", {}).get("input") == ["a", "b"]
 
 
+@pytest.mark.asyncio
+async def test_embed_splits_large_input_into_batches(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "EMBED_BATCH_SIZE", 2)
+
+    async def fake_request(method: str, path: str, **kwargs: object) -> dict:
+        return {"embeddings": [[float(t)] for t in kwargs["json"]["input"]]}
+
+    with patch.object(server, "_request", new_callable=AsyncMock, side_effect=fake_request) as m:
+        out = await server.embed("nomic-embed-text", ["1", "2", "3", "4", "5"])
+    data = json.loads(out)
+    assert m.await_count == 3
+    assert data["count"] == 5
+    assert data["embeddings"] == [[1.0], [2.0], [3.0], [4.0], [5.0]]
+
+
+@pytest.mark.asyncio
+async def test_embed_concurrency_is_shared_across_calls(monkeypatch: pytest.MonkeyPatch) -> None:
+    import asyncio
+
+    monkeypatch.setattr(server, "EMBED_BATCH_SIZE", 1)
+    monkeypatch.setattr(server, "EMBED_CONCURRENCY", 2)
+    monkeypatch.setattr(server, "_embed_semaphore", None)
+    active = peak = 0
+
+    async def fake_request(method: str, path: str, **kwargs: object) -> dict:
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return {"embeddings": [[0.0]]}
+
+    with patch.object(server, "_request", new_callable=AsyncMock, side_effect=fake_request):
+        await asyncio.gather(
+            server.embed("nomic-embed-text", ["a", "b", "c"]),
+            server.embed("nomic-embed-text", ["d", "e", "f"]),
+        )
+    assert peak == 2
+
+
 @pytest.mark.asyncio
 async def test_copy_model() -> None:
     with patch.object(server, "_request", new_callable=AsyncMock, return_value={}):
@@ -271,3 +359,188 @@ async def test_delete_model() -> None:
     with patch.object(server, "_request", new_callable=AsyncMock, return_value={}):
         out = await server.delete_model("old-model")
     assert "Deleted model: old-model" in out
+
+
+@pytest.mark.asyncio
+async def test_get_client_is_shared_and_closed() -> None:
+    server._http_client = None
+    first = await server._get_client()
+    assert await server._get_client() is first
+    await server._close_client()
+    assert server._http_client is None
+    assert first.is_closed
+
+
+@pytest.mark.asyncio
+async def test_request_parses_body_and_empty_response() -> None:
+    import httpx
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.path == "/api/show":
+            return httpx.Response(200, content=b'{"modelfile": "# test"}')
+        return httpx.Response(200)
+
+    server._http_client = httpx.AsyncClient(
+        base_url="http://test-ollama/api", transport=httpx.MockTransport(handler)
+    )
+    try:
+        assert await server._request("POST", "show", json={"name": "m"}) == {"modelfile": "# test"}
+        assert await server._request("DELETE", "delete", json={"name": "m"}) == {}
+    finally:
+        await server._close_client()
+
+
+def test_http2_requires_opt_in_and_https(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "OLLAMA_BASE", "https://ollama.example")
+    monkeypatch.delenv("OLLAMA_HTTP2", raising=False)
+    assert server._http2_enabled() is False
+    monkeypatch.setenv("OLLAMA_HTTP2", "1")
+    monkeypatch.setattr(server, "OLLAMA_BASE", "http://localhost:11434")
+    assert server._http2_enabled() is False
+
+
+def test_json_helpers_without_orjson(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server, "orjson", None)
+    assert server._json_loads(b'{"a": [1, 2]}') == {"a": [1, 2]}
+    assert json.loads(server._json_dumps({"a": 1}, indent=True)) == {"a": 1}
+
+
+@pytest.mark.parametrize("indent", [False, True])
+def test_json_dumps_same_with_and_without_orjson(monkeypatch: pytest.MonkeyPatch, indent: bool) -> None:
+    if server.orjson is None:
+        pytest.skip("orjson not installed")
+    obj = {"embeddings": [[0.5, -1.0]], "count": 1, "text": "café"}
+    with_orjson = server._json_dumps(obj, indent=indent)
+    monkeypatch.setattr(server, "orjson", None)
+    assert server._json_dumps(obj, indent=indent) == with_orjson
+
+
+@pytest.mark.asyncio
+async def test_batch_feeds_output_into_dependent_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def fake_list_models() -> str:
+        return "- llama3.2 (100 MB)"
+
+    async def fake_generate(model: str, prompt: str) -> str:
+        return f"{model}: {prompt}"
+
+    monkeypatch.setitem(server._TOOL_DISPATCH, "list_models", fake_list_models)
+    monkeypatch.setitem(server._TOOL_DISPATCH, "generate", fake_generate)
+    out = await server.batch(
+        [
+            {"id": 2, "tool": "generate", "args": {"model": "m"}, "input_from": 1, "input_path": "prompt"},
+            {"id": 1, "tool": "list_models"},
+        ]
+    )
+    data = json.loads(out)
+    assert [r["id"] for r in data] == [2, 1]
+    assert data[0] == {"id": 2, "tool": "generate", "ok": True, "result": "m: - llama3.2 (100 MB)"}
+
+
+@pytest.mark.asyncio
+async def test_batch_skips_dependents_of_failed_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def failing() -> str:
+        raise httpx.ConnectError("nope")
+
+    monkeypatch.setitem(server._TOOL_DISPATCH, "list_models", failing)
+    out = await server.batch(
+        [
+            {"id": "a", "tool": "list_models"},
+            {"id": "b", "tool": "show_model", "args": {}, "input_from": "a", "input_path": "model"},
+        ]
+    )
+    data = json.loads(out)
+    assert data[0]["ok"] is False and "nope" in data[0]["error"]
+    assert data[1] == {"id": "b", "tool": "show_model", "ok": False, "error": "dependency 'a' failed"}
+
+
+@pytest.mark.asyncio
+async def test_batch_uses_exceptions_not_reply_text_for_failure() -> None:
+    reply = {"response": "Error: the model said so"}
+    with patch.object(server, "_request", new_callable=AsyncMock, return_value=reply):
+        out = await server.batch([{"id": 1, "tool": "generate", "args": {"model": "m", "prompt": "p"}}])
+    assert json.loads(out) == [{"id": 1, "tool": "generate", "ok": True, "result": "Error: the model said so"}]
+    with patch.object(server, "_request", new_callable=AsyncMock, side_effect=httpx.ConnectError("down")):
+        out = await server.batch([{"id": 1, "tool": "show_model", "args": {"model": "m"}}])
+        assert await server.show_model("m") == "Ollama request failed: down"
+    assert json.loads(out) == [{"id": 1, "tool": "show_model", "ok": False, "error": "Ollama request failed: down"}]
+
+
+@pytest.mark.asyncio
+async def test_batch_rejects_cycles_and_unknown_tools() -> None:
+    out = await server.batch(
+        [
+            {"id": 1, "tool": "list_models", "input_from": 2, "input_path": "x"},
+            {"id": 2, "tool": "list_models", "input_from": 1, "input_path": "x"},
+        ]
+    )
+    assert out.startswith("Error: invalid batch") and "cycle" in out
+    out = await server.batch([{"id": 1, "tool": "nope"}])
+    assert "unknown tool" in out
+    out = await server.batch([{"id": 1, "tool": "list_models", "args": "x"}])
+    assert out == "Error: invalid batch: call 1: 'args' must be an object"
+    out = await server.batch([{"id": [1], "tool": "list_models"}])
+    assert out == "Error: invalid batch: call [1]: 'id' must be a string or integer"
+    out = await server.batch([{"id": 1, "tool": "list_models", "input_path": "x"}])
+    assert out == "Error: invalid batch: call 1: input_path requires input_from"
+
+
+@pytest.mark.asyncio
+async def test_batch_reports_unusable_input_path_per_call(monkeypatch: pytest.MonkeyPatch) -> None:
+    async def fake_list_models() -> str:
+        return "- llama3.2 (100 MB)"
+
+    monkeypatch.setitem(server._TOOL_DISPATCH, "list_models", fake_list_models)
+    out = await server.batch(
+        [
+            {"id": "a", "tool": "list_models"},
+            {"id": "b", "tool": "generate", "args": {"prompt": "p"}, "input_from": "a", "input_path": "prompt.x.y"},
+            {"id": "c", "tool": "chat", "args": {"messages": []}, "input_from": "a", "input_path": "messages.0.content"},
+        ]
+    )
+    data = json.loads(out)
+    assert data[0]["ok"] is True
+    assert data[1]["ok"] is False and data[1]["error"].startswith("invalid input_path")
+    assert data[2]["ok"] is False and data[2]["error"].startswith("invalid input_path")
+
+
+@pytest.mark.asyncio
+async def test_stdin_lines_yields_all_buffered_messages() -> None:
+    import os
+
+    r, w = os.pipe()
+    os.write(w, b'{"id":1}\n\n{"id":2}\n{"id":3}')
+    os.close(w)
+    try:
+        lines = [line async for line in server._StdinLines(r, chunk_size=8)]
+    finally:
+        os.close(r)
+    assert lines == [b'{"id":1}', b'{"id":2}', b'{"id":3}']
+
+
+@pytest.mark.asyncio
+async def test_call_tool_fast_path_matches_fastmcp_result_shape() -> None:
+    with patch.object(server, "_request", new_callable=AsyncMock, return_value={"models": []}):
+        fast = await server._call_tool("list_models", {})
+        generic = await server.mcp.call_tool("list_models", {})
+    assert fast == generic
+
+
+@pytest.mark.asyncio
+async def test_call_tool_falls_back_for_untyped_arguments() -> None:
+    with patch.object(server.mcp, "call_tool", new_callable=AsyncMock, return_value="generic") as m:
+        assert await server._call_tool("chat", {"model": "m", "messages": "[]"}) == "generic"
+        assert await server._call_tool("show_model", {}) == "generic"
+        assert await server._call_tool("chat", {"model": "m", "messages": [], "extra": 1}) == "generic"
+    assert m.await_count == 3
+
+
+def test_arg_binder_checks_nested_types() -> None:
+    _, bind = server._FAST_DISPATCH["chat"]
+    assert bind({"model": "m", "messages": [{"role": "user", "content": "hi"}], "stream": True}) is not None
+    assert bind({"model": "m", "messages": [{"role": "user", "content": 1}]}) is None
+    assert bind({"model": "m", "messages": [], "stream": "true"}) is None
+
+
+def test_call_tool_override_falls_back_without_private_hook(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(server.mcp, "_mcp_server", object())
+    assert server._install_call_tool_handler() is False